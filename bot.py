@@ -1,17 +1,22 @@
-from pyrogram import Client, filters
+from pyrogram import Client, filters, idle
 from pyrogram.types import Message, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
-from pymongo import MongoClient, ASCENDING
+from pymongo import MongoClient, ASCENDING, UpdateOne
 from pyrogram.errors import *
+from pyrogram.enums import ParseMode
 from prime import *
 from flask import Flask
-from threading import Thread
+from threading import Thread, Lock
 import os
 import re
 from datetime import datetime, UTC, timedelta # <-- এখানে timedelta যোগ করা হয়েছে
 import asyncio
 import urllib.parse
-from fuzzywuzzy import process
+import secrets
+import time
+from fuzzywuzzy import process, fuzz
+from bson import ObjectId
 from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 
 async def is_subscribed(bot, query, channel):
     btn = []
@@ -37,6 +42,13 @@ stats_col = db["stats"]
 users_col = db["users"]
 settings_col = db["settings"]
 requests_col = db["requests"]
+admin_queue_col = db["admin_queue"]
+callbacks_col = db["callbacks"]
+captions_col = db["movie_captions"]
+feedback_archive_col = db["feedback_archive"]
+requests_archive_col = db["requests_archive"]
+demand_col = db["demand_events"]
+demand_stats_col = db["demand_stats"]
 
 # Indexing - Optimized for faster search
 try:
@@ -61,6 +73,15 @@ movies_col.create_index("language", background=True)
 movies_col.create_index([("title_clean", ASCENDING)], background=True)
 movies_col.create_index([("language", ASCENDING), ("title_clean", ASCENDING)], background=True)
 movies_col.create_index([("views_count", ASCENDING)], background=True)
+demand_col.create_index([("time", ASCENDING)], background=True)
+demand_col.create_index([("cluster", ASCENDING)], background=True)
+demand_stats_col.create_index([("total", ASCENDING)], background=True)
+demand_stats_col.create_index([("last_seen", ASCENDING)], background=True)
+callbacks_col.create_index("created", expireAfterSeconds=CALLBACK_TTL, background=True)
+feedback_col.create_index([("time", ASCENDING)], background=True)
+requests_col.create_index([("request_time", ASCENDING)], background=True)
+feedback_archive_col.create_index("archived_at", expireAfterSeconds=ARCHIVE_TTL_DAYS * 86400, background=True)
+requests_archive_col.create_index("archived_at", expireAfterSeconds=ARCHIVE_TTL_DAYS * 86400, background=True)
 print("All other necessary indexes ensured successfully.")
 
 # Flask App for health check
@@ -81,6 +102,11 @@ def extract_language(text):
     langs = ["Bengali", "Hindi", "English"]
     return next((lang for lang in langs if lang.lower() in text.lower()), None)
 
+def short_title(text):
+    # ডাটাবেসে শুধু ক্যাপশনের প্রথম লাইন টাইটেল হিসেবে রাখা হয়, পুরো টেক্সট movie_captions এ থাকে
+    first_line = next((line.strip() for line in text.splitlines() if line.strip()), text)
+    return first_line[:TITLE_MAX_LENGTH]
+
 def extract_year(text):
     match = re.search(r'\b(19|20)\d{2}\b', text)
     return int(match.group(0)) if match else None
@@ -114,6 +140,422 @@ def find_corrected_matches(query_clean, all_movie_titles_data, score_cutoff=70,
                     break
     return corrected_suggestions
 
+# Hot movies cache - message_id -> {"file_id", "file_unique_id", "caption"} (LRU)
+# শুধু ডেলিভারির সময় ক্যাশে যোগ হয়, যাতে নতুন আপলোডের ভিড়ে জনপ্রিয় মুভিগুলো বাদ না পড়ে।
+# file_id None মানে পোস্টে কোনো মিডিয়া নেই (শুধু টেক্সট), তাই সবসময় ফরওয়ার্ড করা হয়
+media_cache = OrderedDict()
+NO_MEDIA = {"file_id": None, "file_unique_id": None, "caption": None}
+
+def extract_media(msg):
+    media = msg.video or msg.document or msg.audio or msg.animation or msg.photo
+    if not media:
+        return None
+    return {
+        "file_id": media.file_id,
+        "file_unique_id": media.file_unique_id,
+        "caption": msg.caption.html if msg.caption else None
+    }
+
+def cache_media(message_id, media):
+    media_cache[message_id] = media
+    media_cache.move_to_end(message_id)
+    while len(media_cache) > MEDIA_CACHE_SIZE:
+        media_cache.popitem(last=False)
+
+def get_cached_media(message_id):
+    if message_id in media_cache:
+        media_cache.move_to_end(message_id)
+        return media_cache[message_id]
+    movie = movies_col.find_one(
+        {"message_id": message_id, "file_id": {"$exists": True}},
+        {"_id": 0, "file_id": 1, "file_unique_id": 1}
+    )
+    if not movie:
+        return None
+    caption_doc = captions_col.find_one({"_id": message_id}, {"_id": 0, "caption": 1})
+    movie["caption"] = caption_doc.get("caption") if caption_doc else None
+    cache_media(message_id, movie)
+    return movie
+
+def save_media(message_id, media):
+    movies_col.update_one(
+        {"message_id": message_id},
+        {"$set": {"file_id": media["file_id"], "file_unique_id": media["file_unique_id"]}}
+    )
+    captions_col.update_one({"_id": message_id}, {"$set": {"caption": media["caption"]}}, upsert=True)
+
+async def refresh_media(message_id):
+    # চ্যানেল থেকে নতুন file_id নিয়ে ডাটাবেস ও ক্যাশ আপডেট করা হয়
+    try:
+        channel_msg = await app.get_messages(CHANNEL_ID, message_id)
+    except Exception as e:
+        print(f"Error fetching channel message {message_id} for media refresh: {e}")
+        return
+    if not channel_msg or channel_msg.empty:
+        media_cache.pop(message_id, None)
+        return
+    media = extract_media(channel_msg) or NO_MEDIA
+    save_media(message_id, media)
+    cache_media(message_id, media)
+
+async def deliver_movie(chat_id, message_id):
+    media = get_cached_media(message_id)
+    # file_id এর তথ্য না থাকলে (পুরোনো পোস্ট) বা file reference এক্সপায়ার হলেই শুধু রিফ্রেশ করা হয়
+    needs_refresh = media is None
+    if media and media["file_id"]:
+        try:
+            return await app.send_cached_media(
+                chat_id,
+                media["file_id"],
+                caption=media.get("caption") or "",
+                parse_mode=ParseMode.HTML
+            )
+        except (FileReferenceExpired, FileReferenceInvalid, MediaEmpty) as e:
+            print(f"Cached file for message {message_id} expired, refreshing: {e}")
+            media_cache.pop(message_id, None)
+            needs_refresh = True
+        except Exception as e:
+            print(f"Error sending cached media {message_id}, falling back to forward: {e}")
+    fwd = await app.forward_messages(chat_id, CHANNEL_ID, message_id)
+    if needs_refresh:
+        asyncio.create_task(refresh_media(message_id))
+    return fwd
+
+# Callback token store - লম্বা payload এর বদলে ছোট টোকেন callback data তে রাখা হয় (Telegram সীমা 64 bytes)
+callback_cache = OrderedDict()
+
+def cache_callback_payload(token, payload):
+    callback_cache[token] = (time.monotonic() + CALLBACK_TTL, payload)
+    callback_cache.move_to_end(token)
+    while len(callback_cache) > CALLBACK_CACHE_SIZE:
+        callback_cache.popitem(last=False)
+
+def store_callback_payload(payload):
+    # 16 bytes (22 অক্ষর) টোকেন, "noresult:uploaded:" সহও 64 bytes এর মধ্যে থাকে
+    token = secrets.token_urlsafe(16)
+    callbacks_col.insert_one({"_id": token, "payload": payload, "created": datetime.now(UTC)})
+    cache_callback_payload(token, payload)
+    return token
+
+def load_callback_payload(token):
+    cached = callback_cache.get(token)
+    if cached and cached[0] > time.monotonic():
+        callback_cache.move_to_end(token)
+        return cached[1]
+    callback_cache.pop(token, None)
+    # রিস্টার্টের পরেও বাটন কাজ করার জন্য ডাটাবেস থেকে লোড করা হয়
+    doc = callbacks_col.find_one({"_id": token}, {"payload": 1})
+    if not doc:
+        return None
+    cache_callback_payload(token, doc["payload"])
+    return doc["payload"]
+
+# Admin notification queue - একই কুয়েরির নোটিফিকেশন একত্র করে নির্দিষ্ট সময় পরপর ডাইজেস্ট হিসেবে পাঠানো হয়।
+# কিউ ডাটাবেসে রাখা হয়, তাই রিস্টার্ট বা ক্র্যাশ হলেও জমে থাকা নোটিফিকেশন হারায় না
+admin_next_send_time = {}
+admin_digest_task = None
+
+def normalize_query(query):
+    return clean_text(query) or query.strip().lower()
+
+def queue_admin_notification(kind, query, user_id, username):
+    query_clean = normalize_query(query)
+    admin_queue_col.update_one(
+        {"_id": f"{kind}:{query_clean}"},
+        {
+            "$setOnInsert": {"kind": kind, "query": query, "query_clean": query_clean, "first_seen": datetime.now(UTC)},
+            "$inc": {"count": 1},
+            "$set": {f"users.{user_id}": username, "last_user_id": user_id, "last_username": username}
+        },
+        upsert=True
+    )
+    schedule_admin_digest()
+
+def schedule_admin_digest():
+    global admin_digest_task
+    if admin_digest_task is None or admin_digest_task.done():
+        admin_digest_task = asyncio.create_task(flush_admin_notifications_later())
+
+ADMIN_DIGEST_HEADER = "📋 **অ্যাডমিন ডাইজেস্ট**\n"
+
+def build_admin_digest_entry(i, entry, token):
+    query = entry["query"]
+    # লম্বা কুয়েরি পুরো ডাইজেস্টকে MESSAGE_TOO_LONG করে না দেয় তাই ছোট করে দেখানো হয়
+    short_query = query[:60] + ("…" if len(query) > 60 else "")
+    user_id, username = entry["last_user_id"], entry["last_username"]
+    user_count = len(entry["users"])
+    lines = []
+    buttons = []
+    if entry["kind"] == "noresult":
+        lines.append(f"{i}. 🔍 খোঁজা হয়েছে কিন্তু পাওয়া যায়নি: `{short_query}` — {entry['count']} বার, {user_count} জন ইউজার")
+        buttons.append([
+            InlineKeyboardButton(f"{i}. ❌ ভুল নাম", callback_data=f"noresult:wrong:{token}"),
+            InlineKeyboardButton(f"{i}. ⏳ এখনো আসেনি", callback_data=f"noresult:notyet:{token}")
+        ])
+        buttons.append([
+            InlineKeyboardButton(f"{i}. 📤 আপলোড আছে", callback_data=f"noresult:uploaded:{token}"),
+            InlineKeyboardButton(f"{i}. 🚀 শিগগির আসবে", callback_data=f"noresult:coming:{token}")
+        ])
+    else:
+        lines.append(f"{i}. 🎬 মুভির অনুরোধ: `{short_query}` — {entry['count']} বার, {user_count} জন ইউজার")
+        buttons.append([
+            InlineKeyboardButton(f"{i}. ✅ সম্পন্ন হয়েছে", callback_data=f"req:fulfilled:{token}"),
+            InlineKeyboardButton(f"{i}. ❌ বাতিল করা হয়েছে", callback_data=f"req:rejected:{token}")
+        ])
+    lines.append(f"   👤 সর্বশেষ ইউজার: [{username}](tg://user?id={user_id}) (`{user_id}`)")
+    return "\n".join(lines), buttons
+
+def build_admin_digests(entries):
+    # একটি মেসেজে সর্বোচ্চ ADMIN_DIGEST_MAX_ITEMS টি এন্ট্রি এবং ADMIN_DIGEST_MAX_CHARS অক্ষর (Telegram সীমা 4096)
+    digests = []
+    lines, buttons, count = [ADMIN_DIGEST_HEADER], [], 0
+    for entry in entries:
+        token = store_callback_payload({
+            "query": entry["query"],
+            "query_clean": entry["query_clean"],
+            "user_ids": [int(uid) for uid in entry["users"]]
+        })
+        text, rows = build_admin_digest_entry(count + 1, entry, token)
+        if count and (count >= ADMIN_DIGEST_MAX_ITEMS or len("\n".join(lines + [text])) > ADMIN_DIGEST_MAX_CHARS):
+            digests.append(("\n".join(lines), InlineKeyboardMarkup(buttons)))
+            lines, buttons, count = [ADMIN_DIGEST_HEADER], [], 0
+            text, rows = build_admin_digest_entry(1, entry, token)
+        lines.append(text)
+        buttons.extend(rows)
+        count += 1
+    if count:
+        digests.append(("\n".join(lines), InlineKeyboardMarkup(buttons)))
+    return digests
+
+def mark_digest_entry_answered(reply_markup, callback_suffix, label):
+    # ডাইজেস্টের শুধু উত্তর দেওয়া এন্ট্রির বাটনগুলো সরানো হয়, বাকিগুলো থাকে
+    rows = []
+    answered = False
+    for row in reply_markup.inline_keyboard if reply_markup else []:
+        kept = [b for b in row if not (b.callback_data or "").endswith(callback_suffix)]
+        if len(kept) < len(row) and not answered:
+            rows.append([InlineKeyboardButton(label, callback_data="noop")])
+            answered = True
+        if kept:
+            rows.append(kept)
+    if not answered:
+        rows.append([InlineKeyboardButton(label, callback_data="noop")])
+    return InlineKeyboardMarkup(rows)
+
+async def send_to_admin(admin_id, text, reply_markup):
+    # প্রতিটি অ্যাডমিনের জন্য আলাদা রেট লিমিট
+    while True:
+        wait = admin_next_send_time.get(admin_id, 0) - asyncio.get_running_loop().time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        admin_next_send_time[admin_id] = asyncio.get_running_loop().time() + ADMIN_NOTIFY_MIN_DELAY
+        try:
+            await app.send_message(admin_id, text, reply_markup=reply_markup, disable_web_page_preview=True)
+            return
+        except FloodWait as e:
+            admin_next_send_time[admin_id] = asyncio.get_running_loop().time() + e.value
+        except Exception as e:
+            print(f"Could not send admin digest to {admin_id}: {e}")
+            return
+
+async def send_admin_digest_chunks(admin_id, digests):
+    for text, reply_markup in digests:
+        await send_to_admin(admin_id, text, reply_markup)
+
+async def flush_admin_notifications_later():
+    global admin_digest_task
+    await asyncio.sleep(ADMIN_DIGEST_INTERVAL)
+    # find ও delete এর মাঝে ইভেন্ট লুপে অন্য কিছু চলে না, তাই এর মধ্যে কোনো নোটিফিকেশন হারায় না
+    entries = list(admin_queue_col.find({}).sort("first_seen", ASCENDING))
+    admin_queue_col.delete_many({"_id": {"$in": [entry["_id"] for entry in entries]}})
+    # পাঠানোর সময় নতুন নোটিফিকেশন এলে যেন পরের ফ্লাশ শিডিউল হয়
+    admin_digest_task = None
+    if not entries:
+        return
+    digests = build_admin_digests(entries)
+    await asyncio.gather(*(send_admin_digest_chunks(admin_id, digests) for admin_id in ADMIN_IDS))
+
+# Demand analytics - না পাওয়া সার্চ ও অনুরোধগুলো কাছাকাছি নাম অনুযায়ী গ্রুপ (cluster) করে রাখা হয়
+demand_clusters = None
+demand_clusters_lock = Lock()
+demand_stats_lock = Lock()
+
+def get_demand_watermark():
+    setting = settings_col.find_one({"key": "demand_last_id"}, {"value": 1})
+    return setting["value"] if setting else ObjectId("0" * 24)
+
+def load_demand_clusters():
+    # শুধু সাম্প্রতিক (DEMAND_CLUSTER_DAYS দিনের) ক্লাস্টার আর এখনো merge না হওয়া ইভেন্টের ক্লাস্টার লোড হয়,
+    # যাতে প্রতিটি সার্চে পুরো ইতিহাসের উপর fuzzy স্ক্যান না চলে
+    cutoff = datetime.now(UTC) - timedelta(days=DEMAND_CLUSTER_DAYS)
+    recent = demand_stats_col.distinct("_id", {"last_seen": {"$gte": cutoff}})
+    pending = demand_col.distinct("cluster", {"_id": {"$gt": get_demand_watermark()}})
+    return [c for c in set(recent) | set(pending) if c]
+
+def prune_demand_clusters():
+    global demand_clusters
+    with demand_clusters_lock:
+        demand_clusters = load_demand_clusters()
+
+def find_demand_cluster(query_clean):
+    global demand_clusters
+    with demand_clusters_lock:
+        if demand_clusters is None:
+            demand_clusters = load_demand_clusters()
+        if query_clean in demand_clusters:
+            return query_clean
+        # সিক্যুয়েল/সাল আলাদা রাখতে সংখ্যাগুলো হুবহু মিলতে হবে (spiderman vs spiderman2)
+        query_digits = re.findall(r'\d+', query_clean)
+        for cluster, score in process.extract(query_clean, demand_clusters, scorer=fuzz.ratio, limit=5):
+            if score >= DEMAND_CLUSTER_SCORE and re.findall(r'\d+', cluster) == query_digits:
+                return cluster
+        demand_clusters.append(query_clean)
+        return query_clean
+
+async def record_demand(kind, query, user_id):
+    query_clean = normalize_query(query)
+    cluster = await asyncio.get_running_loop().run_in_executor(
+        thread_pool_executor,
+        find_demand_cluster,
+        query_clean
+    )
+    demand_col.insert_one({
+        "kind": kind,
+        "query": query,
+        "query_clean": query_clean,
+        "cluster": cluster,
+        "user_id": user_id,
+        "time": datetime.now(UTC)
+    })
+
+def refresh_demand_stats():
+    # মেইনটেন্যান্স থ্রেড ও /demand একসাথে চললে একই ইভেন্ট দুইবার গোনা এড়াতে লক
+    with demand_stats_lock:
+        _refresh_demand_stats()
+
+def _refresh_demand_stats():
+    # শুধু শেষ রিফ্রেশের পরের ইভেন্টগুলো aggregate করে demand_stats এ merge করা হয়।
+    # ওয়াটারমার্ক হিসেবে ObjectId _id ব্যবহার হয়: ইভেন্টগুলো ইভেন্ট লুপ থেকে একটির পর একটি insert হয়,
+    # তাই সবচেয়ে বড় _id এর চেয়ে ছোট সব ইভেন্ট ইতিমধ্যে ডাটাবেসে আছে
+    since = get_demand_watermark()
+    latest = demand_col.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    if not latest or latest["_id"] <= since:
+        return
+    demand_col.aggregate([
+        {"$match": {"_id": {"$gt": since, "$lte": latest["_id"]}}},
+        {"$sort": {"_id": 1}},
+        {"$group": {
+            "_id": "$cluster",
+            "name": {"$last": "$query"},
+            "total": {"$sum": 1},
+            "searches": {"$sum": {"$cond": [{"$eq": ["$kind", "noresult"]}, 1, 0]}},
+            "requests": {"$sum": {"$cond": [{"$eq": ["$kind", "req"]}, 1, 0]}},
+            "users": {"$addToSet": "$user_id"},
+            "last_seen": {"$max": "$time"}
+        }},
+        {"$set": {"user_count": {"$size": "$users"}}},
+        {"$merge": {
+            "into": "demand_stats",
+            "whenMatched": [
+                {"$set": {
+                    "name": "$$new.name",
+                    "total": {"$add": ["$total", "$$new.total"]},
+                    "searches": {"$add": ["$searches", "$$new.searches"]},
+                    "requests": {"$add": ["$requests", "$$new.requests"]},
+                    "users": {"$slice": [{"$setUnion": ["$users", "$$new.users"]}, 1000]},
+                    "last_seen": {"$max": ["$last_seen", "$$new.last_seen"]}
+                }},
+                {"$set": {"user_count": {"$size": "$users"}}}
+            ],
+            "whenNotMatched": "insert"
+        }}
+    ])
+    settings_col.update_one({"key": "demand_last_id"}, {"$set": {"value": latest["_id"]}}, upsert=True)
+
+# Maintenance - নির্দিষ্ট সময় পরপর পুরোনো ডাটা আর্কাইভ ও ছোট করা হয়, যাতে হট ডাটা RAM এ থাকে
+def archive_old_documents(col, archive_col, time_field, days):
+    cutoff = datetime.now(UTC) - timedelta(days=days)
+    col.aggregate([
+        {"$match": {time_field: {"$lt": cutoff}}},
+        {"$set": {"archived_at": "$$NOW"}},
+        {"$merge": {"into": archive_col.name, "whenMatched": "keepExisting", "whenNotMatched": "insert"}}
+    ])
+    return col.delete_many({time_field: {"$lt": cutoff}}).deleted_count
+
+def compact_movie_captions(batch_size=500):
+    # পুরোনো ডকুমেন্টের পুরো ক্যাপশন movie_captions এ সরিয়ে title ছোট করা হয়।
+    # movie_captions এ আগে থেকে থাকা text/caption কখনো বদলানো হয় না, তাই মাঝপথে থেমে আবার চললেও
+    # ইতিমধ্যে ছোট করা title দিয়ে পুরো টেক্সট হারায় না
+    trimmed = 0
+    caption_ops, movie_ops = [], []
+    # সব মুভির টেক্সট movie_captions এ থাকা দরকার, কারণ /delete_movie ও বাংলা সার্চ সেখানে খোঁজে
+    cursor = movies_col.find({}, {"message_id": 1, "title": 1, "caption": 1})
+    for movie in cursor:
+        caption_ops.append(UpdateOne({"_id": movie["message_id"]}, [{"$set": {
+            "text": {"$ifNull": ["$text", {"$literal": movie["title"]}]},
+            "caption": {"$ifNull": ["$caption", {"$literal": movie.get("caption")}]}
+        }}], upsert=True))
+        title = short_title(movie["title"])
+        if title != movie["title"] or "caption" in movie:
+            movie_ops.append(UpdateOne(
+                {"_id": movie["_id"]},
+                {"$set": {"title": title}, "$unset": {"caption": ""}}
+            ))
+        if len(caption_ops) >= batch_size:
+            # title ছোট করার আগে পুরো টেক্সট movie_captions এ লেখা নিশ্চিত করা হয়
+            captions_col.bulk_write(caption_ops, ordered=False)
+            if movie_ops:
+                movies_col.bulk_write(movie_ops, ordered=False)
+            trimmed += len(movie_ops)
+            caption_ops, movie_ops = [], []
+    if caption_ops:
+        captions_col.bulk_write(caption_ops, ordered=False)
+    if movie_ops:
+        movies_col.bulk_write(movie_ops, ordered=False)
+        trimmed += len(movie_ops)
+    return trimmed
+
+def run_maintenance():
+    feedback_archived = archive_old_documents(feedback_col, feedback_archive_col, "time", FEEDBACK_RETENTION_DAYS)
+    requests_archived = archive_old_documents(requests_col, requests_archive_col, "request_time", REQUEST_RETENTION_DAYS)
+
+    query_cutoff = datetime.now(UTC) - timedelta(days=LAST_QUERY_RETENTION_DAYS)
+    users_cleaned = users_col.update_many(
+        {"last_query": {"$exists": True}, "$or": [
+            {"last_query_time": {"$lt": query_cutoff}},
+            {"last_query_time": {"$exists": False}}
+        ]},
+        {"$unset": {"last_query": "", "last_query_time": ""}}
+    ).modified_count
+
+    # demand_stats এ merge হয়ে যাওয়া পুরোনো ইভেন্টগুলো মুছে ফেলা হয়
+    refresh_demand_stats()
+    events_cutoff = datetime.now(UTC) - timedelta(days=REQUEST_RETENTION_DAYS)
+    events_deleted = demand_col.delete_many(
+        {"_id": {"$lte": get_demand_watermark()}, "time": {"$lt": events_cutoff}}
+    ).deleted_count
+    prune_demand_clusters()
+
+    print(f"Maintenance done: {feedback_archived} feedback and {requests_archived} requests archived, "
+          f"{users_cleaned} users cleaned, {events_deleted} demand events deleted.")
+
+def maintenance_loop():
+    if not settings_col.find_one({"key": "captions_compacted"}, {"value": 1}):
+        try:
+            trimmed = compact_movie_captions()
+            settings_col.update_one({"key": "captions_compacted"}, {"$set": {"value": True}}, upsert=True)
+            print(f"Caption compaction done: {trimmed} movie titles trimmed.")
+        except Exception as e:
+            print(f"Error compacting movie captions: {e}")
+    while True:
+        try:
+            run_maintenance()
+        except Exception as e:
+            print(f"Error running maintenance: {e}")
+        time.sleep(MAINTENANCE_INTERVAL)
+
+Thread(target=maintenance_loop, daemon=True).start()
+
 # Global dictionary to keep track of last start command time per user
 user_last_start_time = {}
 
@@ -125,7 +567,7 @@ async def save_post(_, msg: Message):
 
     movie_to_save = {
         "message_id": msg.id,
-        "title": text,
+        "title": short_title(text),
         "date": msg.date,
         "year": extract_year(text),
         "language": extract_language(text),
@@ -135,13 +577,22 @@ async def save_post(_, msg: Message):
         "dislikes": 0,
         "rated_by": []
     }
+    media = extract_media(msg) or NO_MEDIA
+    movie_to_save["file_id"] = media["file_id"]
+    movie_to_save["file_unique_id"] = media["file_unique_id"]
     
     result = movies_col.update_one({"message_id": msg.id}, {"$set": movie_to_save}, upsert=True)
+    captions_col.update_one(
+        {"_id": msg.id},
+        {"$set": {"text": text, "caption": media["caption"]}},
+        upsert=True
+    )
+    media_cache.pop(msg.id, None)
 
     if result.upserted_id is not None:
-        setting = settings_col.find_one({"key": "global_notify"})
+        setting = settings_col.find_one({"key": "global_notify"}, {"value": 1})
         if setting and setting.get("value"):
-            for user in users_col.find({"notify": {"$ne": False}}):
+            for user in users_col.find({"notify": {"$ne": False}}, {"_id": 1}):
                 try:
                     m = await app.send_message(
                         user["_id"],
@@ -206,17 +657,17 @@ async def start(_, msg: Message):
     if len(msg.command) > 1 and msg.command[1].startswith("watch_"):
         message_id = int(msg.command[1].replace("watch_", ""))
         try:
-            fwd = await app.forward_messages(msg.chat.id, CHANNEL_ID, message_id)
+            fwd = await deliver_movie(msg.chat.id, message_id)
             
-            movie_data = movies_col.find_one({"message_id": message_id})
+            movie_data = movies_col.find_one({"message_id": message_id}, {"likes": 1, "dislikes": 1})
             if movie_data:
                 likes_count = movie_data.get('likes', 0)
                 dislikes_count = movie_data.get('dislikes', 0)
                 
                 rating_buttons = InlineKeyboardMarkup([
                     [
-                        InlineKeyboardButton(f"👍 লাইক ({likes_count})", callback_data=f"like_{message_id}_{user_id}"),
-                        InlineKeyboardButton(f"👎 ডিসলাইক ({dislikes_count})", callback_data=f"dislike_{message_id}_{user_id}")
+                        InlineKeyboardButton(f"👍 লাইক ({likes_count})", callback_data=f"like:{message_id}:{user_id}"),
+                        InlineKeyboardButton(f"👎 ডিসলাইক ({dislikes_count})", callback_data=f"dislike:{message_id}:{user_id}")
                     ]
                 ])
                 rating_message = await app.send_message(
@@ -273,7 +724,7 @@ async def broadcast(_, msg: Message):
         return
     count = 0
     message_to_send = msg.text.split(None, 1)[1]
-    for user in users_col.find():
+    for user in users_col.find({}, {"_id": 1}):
         try:
             await app.send_message(user["_id"], message_to_send)
             count += 1
@@ -321,14 +772,27 @@ async def delete_specific_movie(_, msg: Message):
     
     movie_title_to_delete = msg.text.split(None, 1)[1].strip()
     
-    movie_to_delete = movies_col.find_one({"title": {"$regex": re.escape(movie_title_to_delete), "$options": "i"}})
+    # title এ শুধু প্রথম লাইন থাকে, তাই পুরো ক্যাপশনের টেক্সটে খোঁজা হয়
+    caption_doc = captions_col.find_one(
+        {"text": {"$regex": re.escape(movie_title_to_delete), "$options": "i"}},
+        {"_id": 1}
+    )
+    movie_to_delete = movies_col.find_one(
+        {"message_id": caption_doc["_id"]},
+        {"title": 1, "message_id": 1}
+    ) if caption_doc else None
 
     if not movie_to_delete:
         cleaned_title_to_delete = clean_text(movie_title_to_delete)
-        movie_to_delete = movies_col.find_one({"title_clean": {"$regex": f"^{re.escape(cleaned_title_to_delete)}$", "$options": "i"}})
+        movie_to_delete = movies_col.find_one(
+            {"title_clean": {"$regex": f"^{re.escape(cleaned_title_to_delete)}$", "$options": "i"}},
+            {"title": 1, "message_id": 1}
+        )
 
     if movie_to_delete:
         movies_col.delete_one({"_id": movie_to_delete["_id"]})
+        captions_col.delete_one({"_id": movie_to_delete["message_id"]})
+        media_cache.pop(movie_to_delete["message_id"], None)
         reply_msg = await msg.reply(f"মুভি **{movie_to_delete['title']}** সফলভাবে ডিলিট করা হয়েছে।")
         asyncio.create_task(delete_message_later(reply_msg.chat.id, reply_msg.id))
     else:
@@ -344,36 +808,11 @@ async def delete_all_movies_command(_, msg: Message):
     reply_msg = await msg.reply("আপনি কি নিশ্চিত যে আপনি ডাটাবেস থেকে **সব মুভি** ডিলিট করতে চান? এই প্রক্রিয়াটি অপরিবর্তনীয়!", reply_markup=confirmation_button)
     asyncio.create_task(delete_message_later(reply_msg.chat.id, reply_msg.id))
 
-@app.on_callback_query(filters.regex(r"^noresult_(wrong|notyet|uploaded|coming)_(\d+)_([^ ]+)$") & filters.user(ADMIN_IDS))
-async def handle_admin_reply(_, cq: CallbackQuery):
-    parts = cq.data.split("_", 3)
-    reason = parts[1]
-    user_id = int(parts[2])
-    encoded_query = parts[3]
-    original_query = urllib.parse.unquote_plus(encoded_query)
-
-    messages = {
-        "wrong": f"❌ আপনি **'{original_query}'** নামে ভুল সার্চ করেছেন। অনুগ্রহ করে সঠিক নাম লিখে আবার চেষ্টা করুন।",
-        "notyet": f"⏳ **'{original_query}'** মুভিটি এখনো আমাদের কাছে আসেনি। অনুগ্রহ করে কিছু সময় পর আবার চেষ্টা করুন।",
-        "uploaded": f"📤 **'{original_query}'** মুভিটি ইতিমধ্যে আপলোড করা হয়েছে। সঠিক নামে আবার সার্চ করুন।",
-        "coming": f"🚀 **'{original_query}'** মুভিটি খুব শিগগিরই আমাদের চ্যানেলে আসবে। অনুগ্রহ করে অপেক্ষা করুন."
-    }
-
-    try:
-        m_sent = await app.send_message(user_id, messages[reason])
-        asyncio.create_task(delete_message_later(m_sent.chat.id, m_sent.id))
-        await cq.answer("ব্যবহারকারীকে জানানো হয়েছে ✅", show_alert=True)
-        await cq.message.edit_reply_markup(reply_markup=InlineKeyboardMarkup([[
-            InlineKeyboardButton(f"✅ উত্তর দেওয়া হয়েছে: {messages[reason].split(' ')[0]}", callback_data="noop")
-        ]]))
-    except Exception as e:
-        await cq.answer("ব্যবহারকারীকে মেসেজ পাঠানো যায়নি ❌", show_alert=True)
-        print(f"Error sending admin reply to user {user_id}: {e}")
-
 @app.on_message(filters.command("popular") & (filters.private | filters.group))
 async def popular_movies(_, msg: Message):
     popular_movies_list = list(movies_col.find(
-        {"views_count": {"$exists": True}}
+        {"views_count": {"$exists": True}},
+        {"title": 1, "message_id": 1, "views_count": 1}
     ).sort("views_count", -1).limit(RESULTS_COUNT))
 
     if popular_movies_list:
@@ -413,6 +852,7 @@ async def request_movie(_, msg: Message):
         "user_id": user_id,
         "username": username,
         "movie_name": movie_name,
+        "query_clean": normalize_query(movie_name),
         "request_time": datetime.now(UTC),
         "status": "pending"
     })
@@ -420,24 +860,36 @@ async def request_movie(_, msg: Message):
     m = await msg.reply(f"আপনার অনুরোধ **'{movie_name}'** সফলভাবে জমা দেওয়া হয়েছে। এডমিনরা এটি পর্যালোচনা করবেন।", quote=True)
     asyncio.create_task(delete_message_later(m.chat.id, m.id))
 
-    encoded_movie_name = urllib.parse.quote_plus(movie_name)
-    admin_request_btns = InlineKeyboardMarkup([[
-        InlineKeyboardButton("✅ সম্পন্ন হয়েছে", callback_data=f"req_fulfilled_{user_id}_{encoded_movie_name}"),
-        InlineKeyboardButton("❌ বাতিল করা হয়েছে", callback_data=f"req_rejected_{user_id}_{encoded_movie_name}")
-    ]])
+    queue_admin_notification("req", movie_name, user_id, username)
+    await record_demand("req", movie_name, user_id)
+
+@app.on_message(filters.command("demand") & filters.user(ADMIN_IDS))
+async def demand_command(_, msg: Message):
+    limit = int(msg.command[1]) if len(msg.command) > 1 and msg.command[1].isdigit() else RESULTS_COUNT
+    # limit(0) মানে সীমাহীন, আর বেশি হলে মেসেজ 4096 অক্ষর ছাড়িয়ে যায়
+    limit = max(1, min(limit, 25))
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(thread_pool_executor, refresh_demand_stats)
+    await loop.run_in_executor(thread_pool_executor, prune_demand_clusters)
+
+    top_demand = list(demand_stats_col.find(
+        {},
+        {"name": 1, "total": 1, "searches": 1, "requests": 1, "user_count": 1}
+    ).sort("total", -1).limit(limit))
+
+    if not top_demand:
+        reply_msg = await msg.reply("এখনো কোনো চাহিদার তথ্য পাওয়া যায়নি।")
+        asyncio.create_task(delete_message_later(reply_msg.chat.id, reply_msg.id))
+        return
 
-    for admin_id in ADMIN_IDS:
-        try:
-            await app.send_message(
-                admin_id,
-                f"❗ *নতুন মুভির অনুরোধ!*\n\n"
-                f"🎬 মুভির নাম: `{movie_name}`\n"
-                f"👤 ইউজার: [{username}](tg://user?id={user_id}) (`{user_id}`)",
-                reply_markup=admin_request_btns,
-                disable_web_page_preview=True
-            )
-        except Exception as e:
-            print(f"Could not notify admin {admin_id} about request: {e}")
+    lines = ["📊 **সবচেয়ে বেশি চাওয়া মুভিগুলো:**\n"]
+    for i, item in enumerate(top_demand, 1):
+        lines.append(
+            f"{i}. `{item['name'][:50]}` — মোট {item['total']} "
+            f"(🔍 {item.get('searches', 0)} সার্চ, 🎬 {item.get('requests', 0)} অনুরোধ, 👤 {item.get('user_count', 0)} জন)"
+        )
+    reply_msg = await msg.reply("\n".join(lines))
+    asyncio.create_task(delete_message_later(reply_msg.chat.id, reply_msg.id))
 
 @app.on_message(filters.text & (filters.group | filters.private))
 async def search(_, msg: Message):
@@ -456,7 +908,7 @@ async def search(_, msg: Message):
     user_id = msg.from_user.id
     users_col.update_one(
         {"_id": user_id},
-        {"$set": {"last_query": query}, "$setOnInsert": {"joined": datetime.now(UTC)}},
+        {"$set": {"last_query": query, "last_query_time": datetime.now(UTC)}, "$setOnInsert": {"joined": datetime.now(UTC)}},
         upsert=True
     )
 
@@ -465,11 +917,18 @@ async def search(_, msg: Message):
 
     query_clean = clean_text(query)
     
+    # title এ শুধু প্রথম লাইন থাকে, তাই কাঁচা কুয়েরি পুরো ক্যাপশনের টেক্সটে (movie_captions) খোঁজা হয়
+    caption_ids = [c["_id"] for c in captions_col.find(
+        {"text": {"$regex": re.escape(query), "$options": "i"}},
+        {"_id": 1}
+    ).limit(RESULTS_COUNT)]
+    direct_filters = [{"message_id": {"$in": caption_ids}}]
+    if query_clean:
+        direct_filters.append({"title_clean": {"$regex": f"^{re.escape(query_clean)}", "$options": "i"}})
+
     matched_movies_direct = list(movies_col.find(
-        {"$or": [
-            {"title_clean": {"$regex": f"^{re.escape(query_clean)}", "$options": "i"}},
-            {"title": {"$regex": re.escape(query), "$options": "i"}}
-        ]}
+        {"$or": direct_filters},
+        {"title": 1, "message_id": 1, "views_count": 1}
     ).limit(RESULTS_COUNT))
 
     if matched_movies_direct:
@@ -487,21 +946,25 @@ async def search(_, msg: Message):
         asyncio.create_task(delete_message_later(m.chat.id, m.id))
         return
 
-    all_movie_data_cursor = movies_col.find(
-        {"title_clean": {"$regex": query_clean, "$options": "i"}},
-        {"title_clean": 1, "original_title": "$title", "message_id": 1, "language": 1, "views_count": 1}
-    ).limit(100)
+    if query_clean:
+        all_movie_data_cursor = movies_col.find(
+            {"title_clean": {"$regex": query_clean, "$options": "i"}},
+            {"title_clean": 1, "original_title": "$title", "message_id": 1, "language": 1, "views_count": 1}
+        ).limit(100)
 
-    all_movie_data = list(all_movie_data_cursor)
+        all_movie_data = list(all_movie_data_cursor)
 
-    corrected_suggestions = await asyncio.get_event_loop().run_in_executor(
-        thread_pool_executor,
-        find_corrected_matches,
-        query_clean,
-        all_movie_data,
-        70,
-        RESULTS_COUNT
-    )
+        corrected_suggestions = await asyncio.get_event_loop().run_in_executor(
+            thread_pool_executor,
+            find_corrected_matches,
+            query_clean,
+            all_movie_data,
+            70,
+            RESULTS_COUNT
+        )
+    else:
+        # ইংরেজি অক্ষর/সংখ্যা ছাড়া কুয়েরির (যেমন বাংলা) জন্য fuzzy মিলানোর কিছু নেই
+        all_movie_data, corrected_suggestions = [], []
 
     await loading_message.delete()
 
@@ -515,10 +978,15 @@ async def search(_, msg: Message):
                 )
             ])
         
+        # শুধু message_id রাখা হয়, ভাষা বাটনে ক্লিক করলে এগুলো id দিয়ে আবার পড়া হয়
+        lang_token = store_callback_payload({
+            "query_clean": query_clean,
+            "message_ids": [m["message_id"] for m in all_movie_data]
+        })
         lang_buttons = [
-            InlineKeyboardButton("বেঙ্গলি", callback_data=f"lang_Bengali_{query_clean}"),
-            InlineKeyboardButton("হিন্দি", callback_data=f"lang_Hindi_{query_clean}"),
-            InlineKeyboardButton("ইংলিশ", callback_data=f"lang_English_{query_clean}")
+            InlineKeyboardButton("বেঙ্গলি", callback_data=f"lang:Bengali:{lang_token}"),
+            InlineKeyboardButton("হিন্দি", callback_data=f"lang:Hindi:{lang_token}"),
+            InlineKeyboardButton("ইংলিশ", callback_data=f"lang:English:{lang_token}")
         ]
         buttons.append(lang_buttons)
 
@@ -527,7 +995,8 @@ async def search(_, msg: Message):
     else:
         Google_Search_url = "https://www.google.com/search?q=" + urllib.parse.quote(query)
         
-        request_button = InlineKeyboardButton("এই মুভির জন্য অনুরোধ করুন", callback_data=f"request_movie_{user_id}_{urllib.parse.quote_plus(query)}")
+        request_token = store_callback_payload({"user_id": user_id, "query": query})
+        request_button = InlineKeyboardButton("এই মুভির জন্য অনুরোধ করুন", callback_data=f"request_movie:{request_token}")
         google_button_row = [InlineKeyboardButton("গুগলে সার্চ করুন", url=Google_Search_url)]
         
         reply_markup_for_no_result = InlineKeyboardMarkup([
@@ -548,193 +1017,276 @@ async def search(_, msg: Message):
         )
         asyncio.create_task(delete_message_later(alert.chat.id, alert.id))
 
-        encoded_query = urllib.parse.quote_plus(query)
-        admin_btns = InlineKeyboardMarkup([[
-            InlineKeyboardButton("❌ ভুল নাম", callback_data=f"noresult_wrong_{user_id}_{encoded_query}"),
-            InlineKeyboardButton("⏳ এখনো আসেনি", callback_data=f"noresult_notyet_{user_id}_{encoded_query}")
-        ], [
-            InlineKeyboardButton("📤 আপলোড আছে", callback_data=f"noresult_uploaded_{user_id}_{encoded_query}"),
-            InlineKeyboardButton("🚀 শিগগির আসবে", callback_data=f"noresult_coming_{user_id}_{encoded_query}")
-        ]])
-
-        for admin_id in ADMIN_IDS:
-            try:
-                await app.send_message(
-                    admin_id,
-                    f"❗ *নতুন মুভি খোঁজা হয়েছে কিন্তু পাওয়া যায়নি!*\n\n"
-                    f"🔍 অনুসন্ধান: `{query}`\n"
-                    f"👤 ইউজার: [{msg.from_user.first_name}](tg://user?id={user_id}) (`{user_id}`)",
-                    reply_markup=admin_btns,
-                    disable_web_page_preview=True
-                )
-            except Exception as e:
-                print(f"Could not notify admin {admin_id}: {e}")
+        queue_admin_notification("noresult", query, user_id, msg.from_user.first_name)
+        await record_demand("noresult", query, user_id)
 
-@app.on_callback_query()
-async def callback_handler(_, cq: CallbackQuery):
-    data = cq.data
+async def expired_callback(cq):
+    await cq.answer("এই বাটনের মেয়াদ শেষ হয়ে গেছে। অনুগ্রহ করে আবার সার্চ করুন।", show_alert=True)
 
-    if data == "confirm_delete_all_movies":
-        movies_col.delete_many({})
-        reply_msg = await cq.message.edit_text("✅ ডাটাবেস থেকে সব মুভি সফলভাবে ডিলিট করা হয়েছে।")
-        asyncio.create_task(delete_message_later(reply_msg.chat.id, reply_msg.id))
-        await cq.answer("সব মুভি ডিলিট করা হয়েছে।")
-    elif data == "cancel_delete_all_movies":
-        reply_msg = await cq.message.edit_text("❌ সব মুভি ডিলিট করার প্রক্রিয়া বাতিল করা হয়েছে।")
-        asyncio.create_task(delete_message_later(reply_msg.chat.id, reply_msg.id))
-        await cq.answer("বাতিল করা হয়েছে।")
+async def cb_confirm_delete_all_movies(cq, args, payload, callback_suffix):
+    movies_col.delete_many({})
+    captions_col.delete_many({})
+    media_cache.clear()
+    reply_msg = await cq.message.edit_text("✅ ডাটাবেস থেকে সব মুভি সফলভাবে ডিলিট করা হয়েছে।")
+    asyncio.create_task(delete_message_later(reply_msg.chat.id, reply_msg.id))
+    await cq.answer("সব মুভি ডিলিট করা হয়েছে।")
 
-    elif data.startswith("movie_"):
-        await cq.answer("মুভিটি ফরওয়ার্ড করার জন্য আমাকে ব্যক্তিগতভাবে মেসেজ করুন।", show_alert=True)
+async def cb_cancel_delete_all_movies(cq, args, payload, callback_suffix):
+    reply_msg = await cq.message.edit_text("❌ সব মুভি ডিলিট করার প্রক্রিয়া বাতিল করা হয়েছে।")
+    asyncio.create_task(delete_message_later(reply_msg.chat.id, reply_msg.id))
+    await cq.answer("বাতিল করা হয়েছে।")
 
-    elif data.startswith("lang_"):
-        _, lang, query_clean = data.split("_", 2)
-        
-        potential_lang_matches_cursor = movies_col.find(
-            {"language": lang, "title_clean": {"$regex": query_clean, "$options": "i"}},
-            {"title": 1, "message_id": 1, "title_clean": 1, "views_count": 1}
-        ).limit(50)
+async def cb_noop(cq, args, payload, callback_suffix):
+    await cq.answer()
 
-        potential_lang_matches = list(potential_lang_matches_cursor)
-        
-        fuzzy_data_for_matching_lang = [
-            {"title_clean": m["title_clean"], "original_title": m["title"], "message_id": m["message_id"], 
-             "language": lang, "views_count": m.get("views_count", 0)}
-            for m in potential_lang_matches
-        ]
-        
-        loop = asyncio.get_running_loop()
-        matches_filtered_by_lang = await loop.run_in_executor(
-            thread_pool_executor,
-            find_corrected_matches,
-            query_clean,
-            fuzzy_data_for_matching_lang,
-            70,
-            RESULTS_COUNT
-        )
+async def cb_noresult(cq, args, payload, callback_suffix):
+    reason, = args
+    original_query = payload["query"]
 
-        if matches_filtered_by_lang:
-            buttons = []
-            for m in matches_filtered_by_lang[:RESULTS_COUNT]:
-                buttons.append([InlineKeyboardButton(f"{m['title'][:40]} ({m.get('views_count',0)} ভিউ)", url=f"https://t.me/{app.me.username}?start=watch_{m['message_id']}")])
-            reply_msg = await cq.message.edit_text(
-                f"ফলাফল ({lang}) - নিচের থেকে সিলেক্ট করুন:",
-                reply_markup=InlineKeyboardMarkup(buttons)
-            )
-            asyncio.create_task(delete_message_later(reply_msg.chat.id, reply_msg.id))
-        else:
-            await cq.answer("এই ভাষায় কিছু পাওয়া যায়নি।", show_alert=True)
-        await cq.answer()
-
-    elif data.startswith("request_movie_"):
-        _, user_id_str, encoded_movie_name = data.split("_", 2)
-        user_id = int(user_id_str)
-        movie_name = urllib.parse.unquote_plus(encoded_movie_name)
-        username = cq.from_user.username or cq.from_user.first_name
-
-        requests_col.insert_one({
-            "user_id": user_id,
-            "username": username,
-            "movie_name": movie_name,
-            "request_time": datetime.now(UTC),
-            "status": "pending"
-        })
-        
-        await cq.answer(f"আপনার অনুরোধ '{movie_name}' সফলভাবে জমা দেওয়া হয়েছে।", show_alert=True)
-        
-        admin_request_btns = InlineKeyboardMarkup([[
-            InlineKeyboardButton("✅ সম্পন্ন হয়েছে", callback_data=f"req_fulfilled_{user_id}_{encoded_movie_name}"),
-            InlineKeyboardButton("❌ বাতিল করা হয়েছে", callback_data=f"req_rejected_{user_id}_{encoded_movie_name}")
-        ]])
-
-        for admin_id in ADMIN_IDS:
-            try:
-                await app.send_message(
-                    admin_id,
-                    f"❗ *নতুন মুভির অনুরোধ (ইনলাইন বাটন থেকে)!*\n\n"
-                    f"🎬 মুভির নাম: `{movie_name}`\n"
-                    f"👤 ইউজার: [{username}](tg://user?id={user_id}) (`{user_id}`)",
-                    reply_markup=admin_request_btns,
-                    disable_web_page_preview=True
-                )
-            except Exception as e:
-                print(f"Could not notify admin {admin_id} about request from callback: {e}")
-        
+    messages = {
+        "wrong": f"❌ আপনি **'{original_query}'** নামে ভুল সার্চ করেছেন। অনুগ্রহ করে সঠিক নাম লিখে আবার চেষ্টা করুন।",
+        "notyet": f"⏳ **'{original_query}'** মুভিটি এখনো আমাদের কাছে আসেনি। অনুগ্রহ করে কিছু সময় পর আবার চেষ্টা করুন।",
+        "uploaded": f"📤 **'{original_query}'** মুভিটি ইতিমধ্যে আপলোড করা হয়েছে। সঠিক নামে আবার সার্চ করুন।",
+        "coming": f"🚀 **'{original_query}'** মুভিটি খুব শিগগিরই আমাদের চ্যানেলে আসবে। অনুগ্রহ করে অপেক্ষা করুন."
+    }
+    await reply_to_users(cq, callback_suffix, payload["user_ids"], messages[reason], original_query)
+
+async def cb_req(cq, args, payload, callback_suffix):
+    status, = args
+    movie_name = payload["query"]
+
+    # ডাইজেস্ট এন্ট্রি normalize করা কুয়েরি দিয়ে গ্রুপ করা, তাই সেটি দিয়েই মেলানো হয়
+    query_clean = payload.get("query_clean") or normalize_query(movie_name)
+    requests_col.update_many(
+        {
+            "user_id": {"$in": payload["user_ids"]},
+            "status": "pending",
+            "$or": [{"query_clean": query_clean}, {"movie_name": movie_name}]
+        },
+        {"$set": {"status": status}}
+    )
+    messages = {
+        "fulfilled": f"✅ আপনার অনুরোধ করা মুভি **'{movie_name}'** আপলোড করা হয়েছে। এখনই সার্চ করে দেখুন!",
+        "rejected": f"❌ দুঃখিত, আপনার অনুরোধ করা মুভি **'{movie_name}'** এই মুহূর্তে দেওয়া সম্ভব নয়।"
+    }
+    await reply_to_users(cq, callback_suffix, payload["user_ids"], messages[status], movie_name)
+
+async def reply_to_users(cq, callback_suffix, user_ids, text, original_query):
+    sent = 0
+    for user_id in user_ids:
         try:
-            edited_msg = await cq.message.edit_text(
-                f"❌ দুঃখিত! আপনার খোঁজা মুভিটি খুঁজে পাওয়া যায়নি।\n\n"
-                f"আপনার অনুরোধ **'{movie_name}'** জমা দেওয়া হয়েছে। এডমিনরা এটি পর্যালোচনা করবেন।",
-                reply_markup=None
-            )
-            asyncio.create_task(delete_message_later(edited_msg.chat.id, edited_msg.id))
+            m_sent = await app.send_message(user_id, text)
+            asyncio.create_task(delete_message_later(m_sent.chat.id, m_sent.id))
+            sent += 1
         except Exception as e:
-            print(f"Error editing user message after request: {e}")
+            print(f"Error sending admin reply to user {user_id}: {e}")
+    if not sent:
+        await cq.answer("ব্যবহারকারীকে মেসেজ পাঠানো যায়নি ❌", show_alert=True)
+        return
+    await cq.answer(f"{sent} জন ব্যবহারকারীকে জানানো হয়েছে ✅", show_alert=True)
+    try:
+        await cq.message.edit_reply_markup(reply_markup=mark_digest_entry_answered(
+            cq.message.reply_markup,
+            callback_suffix,
+            f"✅ উত্তর দেওয়া হয়েছে: {text.split(' ')[0]} {original_query[:30]}"
+        ))
+    except Exception as e:
+        print(f"Error editing admin digest after reply: {e}")
 
-    elif data.startswith("like_") or data.startswith("dislike_"):
-        action, message_id_str, user_id_str = data.split("_", 2)
-        movie_message_id = int(message_id_str)
-        user_id = int(user_id_str)
+async def cb_lang(cq, args, payload, callback_suffix):
+    lang, = args
+    query_clean = payload["query_clean"]
 
-        movie = movies_col.find_one({"message_id": movie_message_id})
-        
-        if not movie:
-            await cq.answer("দুঃখিত, এই মুভিটি খুঁজে পাওয়া যায়নি।", show_alert=True)
-            return
+    if "message_ids" in payload:
+        # সার্চের সময় পাওয়া ক্যান্ডিডেটগুলো id দিয়ে আবার পড়া হয়, পুরো regex কুয়েরি আর লাগে না
+        movie_filter = {"message_id": {"$in": payload["message_ids"]}, "language": lang}
+    else:
+        movie_filter = {"language": lang, "title_clean": {"$regex": query_clean, "$options": "i"}}
+    potential_lang_matches = list(movies_col.find(
+        movie_filter,
+        {"title": 1, "message_id": 1, "title_clean": 1, "views_count": 1}
+    ).limit(50))
+
+    fuzzy_data_for_matching_lang = [
+        {"title_clean": m["title_clean"], "original_title": m["title"], "message_id": m["message_id"],
+         "language": lang, "views_count": m.get("views_count", 0)}
+        for m in potential_lang_matches
+    ]
+
+    loop = asyncio.get_running_loop()
+    matches_filtered_by_lang = await loop.run_in_executor(
+        thread_pool_executor,
+        find_corrected_matches,
+        query_clean,
+        fuzzy_data_for_matching_lang,
+        70,
+        RESULTS_COUNT
+    )
 
-        if user_id in movie.get("rated_by", []):
-            await cq.answer("আপনি ইতিমধ্যেই এই মুভিতে রেটিং দিয়েছেন!", show_alert=True)
-            return
+    if matches_filtered_by_lang:
+        buttons = []
+        for m in matches_filtered_by_lang[:RESULTS_COUNT]:
+            buttons.append([InlineKeyboardButton(f"{m['title'][:40]} ({m.get('views_count',0)} ভিউ)", url=f"https://t.me/{app.me.username}?start=watch_{m['message_id']}")])
+        reply_msg = await cq.message.edit_text(
+            f"ফলাফল ({lang}) - নিচের থেকে সিলেক্ট করুন:",
+            reply_markup=InlineKeyboardMarkup(buttons)
+        )
+        asyncio.create_task(delete_message_later(reply_msg.chat.id, reply_msg.id))
+    else:
+        await cq.answer("এই ভাষায় কিছু পাওয়া যায়নি।", show_alert=True)
+    await cq.answer()
 
-        update_query = {"$inc": {}, "$push": {"rated_by": user_id}}
-        if action == "like":
-            update_query["$inc"]["likes"] = 1
-        elif action == "dislike":
-            update_query["$inc"]["dislikes"] = 1
-        
-        movies_col.update_one({"message_id": movie_message_id}, update_query)
-        
-        updated_movie = movies_col.find_one({"message_id": movie_message_id})
-        updated_likes = updated_movie.get('likes', 0)
-        updated_dislikes = updated_movie.get('dislikes', 0)
-
-        new_rating_buttons = InlineKeyboardMarkup([
-            [
-                InlineKeyboardButton(f"👍 লাইক ({updated_likes})", callback_data="noop"),
-                InlineKeyboardButton(f"👎 ডিসলাইক ({updated_dislikes})", callback_data="noop")
-            ]
-        ])
+async def cb_request_movie(cq, args, payload, callback_suffix):
+    user_id = payload["user_id"]
+    movie_name = payload["query"]
+    username = cq.from_user.username or cq.from_user.first_name
 
-        try:
-            await cq.message.edit_reply_markup(reply_markup=new_rating_buttons)
-            await cq.answer("আপনার রেটিং রেকর্ড করা হয়েছে! ধন্যবাদ।", show_alert=True)
-        except Exception as e:
-            print(f"Error editing message after rating: {e}")
-            await cq.answer("রেটিং আপডেট করতে সমস্যা হয়েছে।", show_alert=True)
-
-    elif "_" in data:
-        parts = data.split("_", 3)
-        if len(parts) == 4 and parts[0] in ["has", "no", "soon", "wrong"]: 
-            action, uid, mid, raw_query = parts
-            uid = int(uid)
-            responses = {
-                "has": f"✅ @{cq.from_user.username or cq.from_user.first_name} জানিয়েছেন যে **{raw_query}** মুভিটি ডাটাবেজে আছে। সঠিক নাম লিখে আবার চেষ্টা করুন।",
-                "no": f"❌ @{cq.from_user.username or cq.from_user.first_name} জানিয়েছেন যে **{raw_query}** মুভিটি ডাটাবেজে নেই।",
-                "soon": f"⏳ @{cq.from_user.username or cq.from_user.first_name} জানিয়েছেন যে **{raw_query}** মুভিটি শীঘ্রই আসবে।",
-                "wrong": f"✏️ @{cq.from_user.username or cq.from_user.first_name} বলছেন যে আপনি ভুল নাম লিখেছেন: **{raw_query}**।"
-            }
-            if action in responses:
-                try:
-                    m = await app.send_message(uid, responses[action])
-                    asyncio.create_task(delete_message_later(m.chat.id, m.id))
-                    await cq.answer("অ্যাডমিনের পক্ষ থেকে উত্তর পাঠানো হয়েছে।")
-                except Exception as e:
-                    await cq.answer("ইউজারকে বার্তা পাঠাতে সমস্যা হয়েছে।", show_alert=True)
-                    print(f"Error sending admin feedback message: {e}")
-            else:
-                await cq.answer("অকার্যকর কলব্যাক ডেটা।", show_alert=True)
-        else:
+    requests_col.insert_one({
+        "user_id": user_id,
+        "username": username,
+        "movie_name": movie_name,
+        "query_clean": normalize_query(movie_name),
+        "request_time": datetime.now(UTC),
+        "status": "pending"
+    })
+
+    await cq.answer(f"আপনার অনুরোধ '{movie_name}' সফলভাবে জমা দেওয়া হয়েছে।", show_alert=True)
+
+    queue_admin_notification("req", movie_name, user_id, username)
+    await record_demand("req", movie_name, user_id)
+
+    try:
+        edited_msg = await cq.message.edit_text(
+            f"❌ দুঃখিত! আপনার খোঁজা মুভিটি খুঁজে পাওয়া যায়নি।\n\n"
+            f"আপনার অনুরোধ **'{movie_name}'** জমা দেওয়া হয়েছে। এডমিনরা এটি পর্যালোচনা করবেন।",
+            reply_markup=None
+        )
+        asyncio.create_task(delete_message_later(edited_msg.chat.id, edited_msg.id))
+    except Exception as e:
+        print(f"Error editing user message after request: {e}")
+
+async def cb_rate(cq, args, action):
+    movie_message_id = int(args[0])
+    user_id = int(args[1])
+
+    # পুরো rated_by অ্যারে না এনে শুধু এই ইউজারের এন্ট্রি আনা হয়
+    movie = movies_col.find_one(
+        {"message_id": movie_message_id},
+        {"rated_by": {"$elemMatch": {"$eq": user_id}}}
+    )
+
+    if not movie:
+        await cq.answer("দুঃখিত, এই মুভিটি খুঁজে পাওয়া যায়নি।", show_alert=True)
+        return
+
+    if user_id in movie.get("rated_by", []):
+        await cq.answer("আপনি ইতিমধ্যেই এই মুভিতে রেটিং দিয়েছেন!", show_alert=True)
+        return
+
+    update_query = {"$inc": {}, "$push": {"rated_by": user_id}}
+    if action == "like":
+        update_query["$inc"]["likes"] = 1
+    elif action == "dislike":
+        update_query["$inc"]["dislikes"] = 1
+
+    movies_col.update_one({"message_id": movie_message_id}, update_query)
+
+    updated_movie = movies_col.find_one({"message_id": movie_message_id}, {"likes": 1, "dislikes": 1})
+    updated_likes = updated_movie.get('likes', 0)
+    updated_dislikes = updated_movie.get('dislikes', 0)
+
+    new_rating_buttons = InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton(f"👍 লাইক ({updated_likes})", callback_data="noop"),
+            InlineKeyboardButton(f"👎 ডিসলাইক ({updated_dislikes})", callback_data="noop")
+        ]
+    ])
+
+    try:
+        await cq.message.edit_reply_markup(reply_markup=new_rating_buttons)
+        await cq.answer("আপনার রেটিং রেকর্ড করা হয়েছে! ধন্যবাদ।", show_alert=True)
+    except Exception as e:
+        print(f"Error editing message after rating: {e}")
+        await cq.answer("রেটিং আপডেট করতে সমস্যা হয়েছে।", show_alert=True)
+
+# Callback dispatch table - action -> (handler, admin_only, uses_token)
+# কলব্যাক ডেটার ফরম্যাট: action[:arg...][:token]
+CALLBACK_HANDLERS = {
+    "confirm_delete_all_movies": (cb_confirm_delete_all_movies, True, False),
+    "cancel_delete_all_movies": (cb_cancel_delete_all_movies, True, False),
+    "noop": (cb_noop, False, False),
+    "noresult": (cb_noresult, True, True),
+    "req": (cb_req, True, True),
+    "lang": (cb_lang, False, True),
+    "request_movie": (cb_request_movie, False, True),
+    "like": (lambda cq, args, payload, callback_suffix: cb_rate(cq, args, "like"), False, False),
+    "dislike": (lambda cq, args, payload, callback_suffix: cb_rate(cq, args, "dislike"), False, False),
+}
+
+# পুরোনো underscore ফরম্যাটের বাটন (টোকেন চালুর আগে পাঠানো) -> (action, args, payload, callback_suffix)
+LEGACY_CALLBACK_PATTERNS = [
+    (re.compile(r"^noresult_(wrong|notyet|uploaded|coming)_(\d+)_(.+)$"),
+     lambda m: ("noresult", [m[1]], {"query": urllib.parse.unquote_plus(m[3]), "user_ids": [int(m[2])]}, f"_{m[2]}_{m[3]}")),
+    (re.compile(r"^req_(fulfilled|rejected)_(\d+)_(.+)$"),
+     lambda m: ("req", [m[1]], {"query": urllib.parse.unquote_plus(m[3]), "user_ids": [int(m[2])]}, f"_{m[2]}_{m[3]}")),
+    (re.compile(r"^request_movie_(\d+)_(.+)$"),
+     lambda m: ("request_movie", [], {"user_id": int(m[1]), "query": urllib.parse.unquote_plus(m[2])}, None)),
+    (re.compile(r"^lang_(Bengali|Hindi|English)_(.*)$"),
+     lambda m: ("lang", [m[1]], {"query_clean": m[2]}, None)),
+    (re.compile(r"^(like|dislike)_(\d+)_(\d+)$"),
+     lambda m: (m[1], [m[2], m[3]], None, None)),
+]
+
+def parse_legacy_callback(data):
+    for pattern, build in LEGACY_CALLBACK_PATTERNS:
+        match = pattern.match(data)
+        if match:
+            return build(match)
+    return None
+
+@app.on_callback_query()
+async def callback_handler(_, cq: CallbackQuery):
+    legacy = parse_legacy_callback(cq.data)
+    if legacy:
+        action, args, payload, callback_suffix = legacy
+    else:
+        action, *args = cq.data.split(":")
+        payload, callback_suffix = None, None
+
+    handler = CALLBACK_HANDLERS.get(action)
+    if handler is None:
+        await cq.answer("অকার্যকর কলব্যাক ডেটা।", show_alert=True)
+        return
+
+    func, admin_only, uses_token = handler
+    if admin_only and cq.from_user.id not in ADMIN_IDS:
+        await cq.answer("এই বাটনটি শুধুমাত্র অ্যাডমিনদের জন্য।", show_alert=True)
+        return
+
+    if uses_token and not legacy:
+        if not args:
             await cq.answer("অকার্যকর কলব্যাক ডেটা।", show_alert=True)
+            return
+        token = args.pop()
+        payload = load_callback_payload(token)
+        if payload is None:
+            return await expired_callback(cq)
+        callback_suffix = f":{token}"
+
+    try:
+        await func(cq, args, payload, callback_suffix)
+    except (ValueError, KeyError) as e:
+        await cq.answer("অকার্যকর কলব্যাক ডেটা।", show_alert=True)
+        print(f"Malformed callback data {cq.data!r}: {e}")
+
+async def main():
+    await app.start()
+    # রিস্টার্টের আগে জমে থাকা অ্যাডমিন নোটিফিকেশন থাকলে ডাইজেস্ট শিডিউল করা হয়
+    if admin_queue_col.find_one({}, {"_id": 1}):
+        schedule_admin_digest()
+    await idle()
+    await app.stop()
 
 if __name__ == "__main__":
     print("বট শুরু হচ্ছে...")
-    app.run()
+    app.run(main())
@@ -14,3 +14,18 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 UPDATE_CHANNEL = os.getenv("UPDATE_CHANNEL", "https://t.me/PrimeCineZone")
 AUTH_CHANNEL = [int(ch) if id_pattern.search(ch) else ch for ch in environ.get('AUTH_CHANNEL', '-1002323796637').split()] # give channel id with separate space. Ex: ('-10073828 -102782829 -1007282828')
 START_PIC = os.getenv("START_PIC", "https://i.postimg.cc/SRQn4Dwg/IMG-20250606-112525-389.jpg")
+MEDIA_CACHE_SIZE = int(os.getenv("MEDIA_CACHE_SIZE", 200))
+ADMIN_DIGEST_INTERVAL = int(os.getenv("ADMIN_DIGEST_INTERVAL", 300))
+ADMIN_DIGEST_MAX_ITEMS = int(os.getenv("ADMIN_DIGEST_MAX_ITEMS", 10))
+ADMIN_DIGEST_MAX_CHARS = int(os.getenv("ADMIN_DIGEST_MAX_CHARS", 3500))
+ADMIN_NOTIFY_MIN_DELAY = float(os.getenv("ADMIN_NOTIFY_MIN_DELAY", 3))
+DEMAND_CLUSTER_SCORE = int(os.getenv("DEMAND_CLUSTER_SCORE", 85))
+DEMAND_CLUSTER_DAYS = int(os.getenv("DEMAND_CLUSTER_DAYS", 30))
+CALLBACK_TTL = int(os.getenv("CALLBACK_TTL", 7 * 24 * 3600))
+CALLBACK_CACHE_SIZE = int(os.getenv("CALLBACK_CACHE_SIZE", 1000))
+TITLE_MAX_LENGTH = int(os.getenv("TITLE_MAX_LENGTH", 200))
+FEEDBACK_RETENTION_DAYS = int(os.getenv("FEEDBACK_RETENTION_DAYS", 90))
+REQUEST_RETENTION_DAYS = int(os.getenv("REQUEST_RETENTION_DAYS", 90))
+LAST_QUERY_RETENTION_DAYS = int(os.getenv("LAST_QUERY_RETENTION_DAYS", 30))
+ARCHIVE_TTL_DAYS = int(os.getenv("ARCHIVE_TTL_DAYS", 365))
+MAINTENANCE_INTERVAL = int(os.getenv("MAINTENANCE_INTERVAL", 6 * 3600))